@@ -0,0 +1,180 @@
+"""
+Input-size budgeting for long journal entries
+Splits long text into sentence-aligned chunks and merges per-chunk
+analysis results back into a single emotion, scores and keywords
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Any, List
+
+
+# Rough averages for Llama tokenizers: ~4 chars per token for
+# space-separated text, about one token per CJK character
+CHARS_PER_TOKEN = 4
+CJK = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])\s*|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a tokenizer
+
+    Args:
+        text: Any text
+
+    Returns:
+        Approximate token count
+    """
+    cjk = len(CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / CHARS_PER_TOKEN)
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    # Last resort for runs with no sentence or word boundary to break on
+    pieces: List[str] = []
+    start = 0
+    tokens = 0.0
+    for i, char in enumerate(text):
+        cost = 1.0 if CJK.match(char) else 1 / CHARS_PER_TOKEN
+        if i > start and tokens + cost > max_tokens:
+            pieces.append(text[start:i])
+            start, tokens = i, 0.0
+        tokens += cost
+    pieces.append(text[start:])
+    return pieces
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation and line breaks
+
+    Args:
+        text: Journal text
+
+    Returns:
+        Non-empty sentences in order
+    """
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most max_tokens
+
+    Sentences longer than max_tokens on their own are split on word
+    boundaries, and words that are still too long (e.g. CJK text without
+    spaces) are cut by character.
+
+    Args:
+        text: Journal text
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunks covering the whole text in order
+    """
+    pieces: List[str] = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words: List[str] = []
+        for word in sentence.split():
+            if estimate_tokens(word) > max_tokens:
+                if words:
+                    pieces.append(" ".join(words))
+                    words = []
+                pieces.extend(_hard_split(word, max_tokens))
+                continue
+            if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for piece in pieces:
+        if current and estimate_tokens(" ".join(current + [piece])) > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def select_chunks(chunks: List[str], max_chunks: int) -> List[str]:
+    """
+    Keep at most max_chunks, spread evenly across the entry
+
+    Args:
+        chunks: All chunks in order
+        max_chunks: How many the prompt budget allows
+
+    Returns:
+        The selected chunks in order
+    """
+    if len(chunks) <= max_chunks:
+        return chunks
+    if max_chunks <= 1:
+        return chunks[:1]
+    step = (len(chunks) - 1) / (max_chunks - 1)
+    return [chunks[round(i * step)] for i in range(max_chunks)]
+
+
+def _usable(results: List[Dict[str, Any]], weights: List[int], node: str) -> List[tuple]:
+    # Chunks where the node fell back hold made-up defaults, so they only
+    # count when every chunk fell back and there is nothing better
+    pairs = list(zip(results, weights))
+    usable = [(r, w) for r, w in pairs if node not in r.get("fallbacks", [])]
+    return usable or pairs
+
+
+def reduce_results(results: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """
+    Merge per-chunk analyses, weighting each chunk by its token count
+
+    Chunks whose node fell back to its default output are left out of that
+    node's part of the merge.
+
+    Args:
+        results: States returned by the emotion, score and keyword nodes
+        weights: Token count of each chunk
+
+    Returns:
+        Dict with emotion, mood/energy/stress scores, top 3 keywords and the
+        nodes that fell back on every chunk
+    """
+    emotion_weights: Counter = Counter()
+    for result, weight in _usable(results, weights, "extract_emotion"):
+        emotion_weights[result["emotion"]] += weight
+
+    merged: Dict[str, Any] = {"emotion": emotion_weights.most_common(1)[0][0]}
+    scored = _usable(results, weights, "generate_scores")
+    total = sum(w for _, w in scored)
+    for score in ("mood_score", "energy_score", "stress_score"):
+        average = sum(r[score] * w for r, w in scored) / total
+        merged[score] = min(5, max(1, round(average)))
+
+    # Rank keywords case-insensitively, keeping the first spelling seen
+    keyword_weights: Counter = Counter()
+    spellings: Dict[str, str] = {}
+    for result, weight in _usable(results, weights, "extract_keywords"):
+        for keyword in result["keywords"]:
+            key = keyword.lower()
+            spellings.setdefault(key, keyword)
+            keyword_weights[key] += weight
+    merged["keywords"] = [spellings[key] for key, _ in keyword_weights.most_common(3)]
+    while len(merged["keywords"]) < 3:
+        merged["keywords"].append("reflective")
+
+    merged["fallbacks"] = [
+        node for node in ("extract_emotion", "generate_scores", "extract_keywords")
+        if all(node in r.get("fallbacks", []) for r in results)
+    ]
+
+    return merged
@@ -9,7 +9,9 @@ from ai.nodes import (
     extract_emotion,
     generate_scores,
     extract_keywords,
-    generate_reflection
+    generate_reflection,
+    analyze_long_input,
+    route_input
 )
 
 
@@ -22,6 +24,13 @@ class EmotionState(TypedDict):
     stress_score: int
     keywords: list[str]
     reflection: str
+    user_id: str  # optional, for fair scheduling of Groq calls
+    priority: str  # optional, "background" for bulk jobs
+    prompt_tokens: int  # estimated prompt tokens sent for this entry
+    reflection_input: str  # long inputs: the excerpt the reflection is based on
+    chunk_count: int
+    chunks_analyzed: int
+    fallbacks: list[str]  # nodes whose output is a default, not a model answer
 
 
 def create_emotion_graph():
@@ -34,6 +43,9 @@ def create_emotion_graph():
     3. Extract top 3 emotional keywords
     4. Generate supportive reflection message
     
+    Long inputs replace steps 1-3 with a single step that runs them over
+    sentence-aligned chunks in parallel and merges the results.
+    
     Returns:
         Compiled StateGraph ready for execution
     """
@@ -45,12 +57,17 @@ def create_emotion_graph():
     workflow.add_node("generate_scores", generate_scores)
     workflow.add_node("extract_keywords", extract_keywords)
     workflow.add_node("generate_reflection", generate_reflection)
+    workflow.add_node("analyze_long_input", analyze_long_input)
     
     # Define the flow
-    workflow.set_entry_point("extract_emotion")
+    workflow.set_conditional_entry_point(
+        route_input,
+        {"short": "extract_emotion", "long": "analyze_long_input"}
+    )
     workflow.add_edge("extract_emotion", "generate_scores")
     workflow.add_edge("generate_scores", "extract_keywords")
     workflow.add_edge("extract_keywords", "generate_reflection")
+    workflow.add_edge("analyze_long_input", "generate_reflection")
     workflow.add_edge("generate_reflection", END)
     
     # Compile and return
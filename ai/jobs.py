@@ -0,0 +1,113 @@
+"""
+Background job queue for emotion analysis
+Runs the LangGraph workflow on a process-wide worker pool so the UI can
+enqueue entries and return immediately
+"""
+
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from ai.graph import create_emotion_graph
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_DEPTH = 32
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at its depth limit and cannot take more jobs"""
+
+
+class AnalysisJob:
+    """A single queued analysis of one journal entry"""
+
+    def __init__(self, job_id: int, user_input: str):
+        self.id = job_id
+        self.user_input = user_input
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+class AnalysisJobQueue:
+    """
+    Bounded queue in front of a thread pool running the emotion workflow
+
+    Analysis is dominated by waiting on Groq, so threads are enough to
+    overlap many entries; the depth limit applies backpressure once more
+    jobs are outstanding than the workers can reasonably drain.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_depth: Optional[int] = None):
+        """
+        Args:
+            max_workers: Worker threads (EMOTION_ANALYSIS_WORKERS, default 4)
+            max_depth: Max queued or running jobs (EMOTION_ANALYSIS_QUEUE_DEPTH, default 32)
+        """
+        self.max_workers = max_workers or int(os.getenv("EMOTION_ANALYSIS_WORKERS", DEFAULT_WORKERS))
+        self.max_depth = max_depth or int(os.getenv("EMOTION_ANALYSIS_QUEUE_DEPTH", DEFAULT_QUEUE_DEPTH))
+        self._workflow = create_emotion_graph()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="emotion-analysis")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._outstanding = 0
+
+    @property
+    def outstanding(self) -> int:
+        """Number of jobs queued or running"""
+        return self._outstanding
+
+    def submit(self, user_input: str, **state: Any) -> AnalysisJob:
+        """
+        Enqueue an entry for analysis
+
+        Args:
+            user_input: Journal text to analyze
+            **state: Extra initial workflow state
+
+        Returns:
+            The queued job, updated in place as it progresses
+
+        Raises:
+            QueueFullError: If max_depth jobs are already outstanding
+            RuntimeError: If the queue has been shut down
+        """
+        with self._lock:
+            if self._outstanding >= self.max_depth:
+                raise QueueFullError(
+                    f"Analysis queue is full ({self.max_depth} jobs pending)"
+                )
+            self._outstanding += 1
+            job = AnalysisJob(next(self._ids), user_input)
+
+        try:
+            self._executor.submit(self._run, job, {"user_input": user_input, **state})
+        except RuntimeError:
+            # The executor is shut down, so the job will never run
+            with self._lock:
+                self._outstanding -= 1
+            raise
+        return job
+
+    def _run(self, job: AnalysisJob, initial_state: Dict[str, Any]) -> None:
+        job.status = "running"
+        try:
+            job.result = self._workflow.invoke(initial_state)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running jobs"""
+        self._executor.shutdown(wait=True)
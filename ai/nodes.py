@@ -3,18 +3,95 @@ AI nodes for emotion analysis using Groq API
 """
 
 from groq import Groq
+import functools
 import os
 import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 from dotenv import load_dotenv
+from ai.chunking import estimate_tokens, chunk_text, select_chunks, reduce_results
+from ai.routing import ModelRouter, load_routes
+from ai.scheduler import GroqScheduler, INTERACTIVE, REFLECTION, BACKGROUND
 
 load_dotenv()
 
+# Latency budget and ranked models per node; "local" is the node's own fallback
+NODE_ROUTES = {
+    "extract_emotion": {"budget_ms": 2000, "models": ["llama-3.1-8b-instant", "local"], "max_tokens": 10},
+    "generate_scores": {"budget_ms": 2500, "models": ["llama-3.1-8b-instant", "local"], "max_tokens": 50},
+    "extract_keywords": {"budget_ms": 2500, "models": ["llama-3.1-8b-instant", "local"], "max_tokens": 30},
+    "generate_reflection": {"budget_ms": 6000, "models": ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "local"], "max_tokens": 80},
+}
+
+# Entries above LONG_INPUT_TOKENS are analyzed in chunks of CHUNK_TOKENS,
+# with every prompt sent for the entry capped at MAX_PROMPT_TOKENS in total
+LONG_INPUT_TOKENS = int(os.getenv("EMOTION_LONG_INPUT_TOKENS", 400))
+CHUNK_TOKENS = int(os.getenv("EMOTION_CHUNK_TOKENS", 300))
+MAX_PROMPT_TOKENS = int(os.getenv("EMOTION_MAX_PROMPT_TOKENS", 6000))
+MAX_PARALLEL_CHUNKS = 4
+
+# Prompt template tokens around the input, for budgeting before anything is sent
+MAP_TEMPLATE_TOKENS = 80  # emotion + scores + keywords prompts
+REFLECTION_TEMPLATE_TOKENS = 250
+
+# Times each node fell back to its default output, for load testing
+FALLBACK_COUNTS: Counter = Counter()
+_fallback_lock = threading.Lock()
+
+
+def record_fallback(node: str, state: Dict[str, Any]) -> None:
+    # Marked in the state too, so chunk merging can ignore made-up defaults
+    state["fallbacks"] = state.get("fallbacks", []) + [node]
+    with _fallback_lock:
+        FALLBACK_COUNTS[node] += 1
+
+
+@functools.lru_cache(maxsize=4)
+def _groq_client(api_key: str, base_url: str, max_retries: int) -> Groq:
+    return Groq(api_key=api_key, base_url=base_url or None, max_retries=max_retries)
+
+
 def get_groq_client():
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key or api_key == "YOUR_GROQ_API_KEY_HERE":
         raise ValueError("GROQ_API_KEY not found in environment variables")
-    return Groq(api_key=api_key)
+    # Clients are reused so each call doesn't pay for building a new one.
+    # Load tests set GROQ_MAX_RETRIES=0 so injected faults are not hidden by SDK retries
+    return _groq_client(api_key, os.getenv("GROQ_BASE_URL", ""),
+                        int(os.getenv("GROQ_MAX_RETRIES", 2)))
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter(
+                load_routes(NODE_ROUTES),
+                get_groq_client,
+                max_inflight=int(os.getenv("EMOTION_ROUTE_MAX_INFLIGHT", 16)),
+                scheduler=GroqScheduler()
+            )
+    return _router
+
+
+def _complete(node: str, state: Dict[str, Any], prompt: str, temperature: float,
+              priority: int = INTERACTIVE) -> str:
+    # Bulk callers mark their state as background so they never crowd out users
+    if state.get("priority") == "background":
+        priority = BACKGROUND
+    usage = {"prompt_tokens": 0}
+    try:
+        return get_router().complete(node, prompt, temperature=temperature,
+                                     user=state.get("user_id", "anonymous"), priority=priority,
+                                     usage=usage)
+    finally:
+        state["prompt_tokens"] = state.get("prompt_tokens", 0) + usage["prompt_tokens"]
 
 
 def extract_emotion(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -27,14 +104,7 @@ Text: "{user_input}"
 Respond with ONLY the emotion word."""
     
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0.3,
-            max_tokens=10
-        )
-        emotion = response.choices[0].message.content.strip()
+        emotion = _complete("extract_emotion", state, prompt, temperature=0.3)
         
         valid_emotions = ["Happy", "Sad", "Angry", "Anxious", "Stressed", "Tired", "Excited", "Lonely"]
         if emotion not in valid_emotions:
@@ -45,10 +115,12 @@ Respond with ONLY the emotion word."""
                     break
             else:
                 emotion = "Anxious"
+                record_fallback("extract_emotion", state)
             
         state["emotion"] = emotion
     except Exception as e:
         print(f"Error: {e}")
+        record_fallback("extract_emotion", state)
         state["emotion"] = "Anxious"
     
     return state
@@ -67,14 +139,7 @@ Energy: Y
 Stress: Z"""
     
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0.3,
-            max_tokens=50
-        )
-        text = response.choices[0].message.content.strip()
+        text = _complete("generate_scores", state, prompt, temperature=0.3)
         
         mood_match = re.search(r'Mood:\s*(\d)', text)
         energy_match = re.search(r'Energy:\s*(\d)', text)
@@ -83,9 +148,12 @@ Stress: Z"""
         state["mood_score"] = int(mood_match.group(1)) if mood_match else 3
         state["energy_score"] = int(energy_match.group(1)) if energy_match else 3
         state["stress_score"] = int(stress_match.group(1)) if stress_match else 3
+        if not (mood_match and energy_match and stress_match):
+            record_fallback("generate_scores", state)
         
     except Exception as e:
         print(f"Error: {e}")
+        record_fallback("generate_scores", state)
         state["mood_score"] = 3
         state["energy_score"] = 3
         state["stress_score"] = 3
@@ -101,16 +169,11 @@ def extract_keywords(state: Dict[str, Any]) -> Dict[str, Any]:
 Format: word1, word2, word3"""
     
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0.5,
-            max_tokens=30
-        )
-        keywords_text = response.choices[0].message.content.strip()
+        keywords_text = _complete("extract_keywords", state, prompt, temperature=0.5)
         keywords = [kw.strip() for kw in keywords_text.split(',')][:3]
         
+        if len(keywords) < 3:
+            record_fallback("extract_keywords", state)
         while len(keywords) < 3:
             keywords.append("reflective")
             
@@ -118,6 +181,7 @@ Format: word1, word2, word3"""
         
     except Exception as e:
         print(f"Error: {e}")
+        record_fallback("extract_keywords", state)
         state["keywords"] = ["thoughtful", "reflective", "aware"]
     
     return state
@@ -140,7 +204,7 @@ You don't have to face this alone."""
     
     prompt = f"""
     You are a supportive friend, not a therapist.
-    The user wrote: "{user_input}"
+    The user wrote: "{state.get("reflection_input") or user_input}"
 
     Write a warm reply that:
     - Validates their feelings clearly
@@ -162,18 +226,54 @@ You don't have to face this alone."""
 
     
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0.7,
-            max_tokens=50
-        )
-        reflection = response.choices[0].message.content.strip().strip('"')
+        reflection = _complete("generate_reflection", state, prompt, temperature=0.7, priority=REFLECTION).strip('"')
         state["reflection"] = reflection
         
     except Exception as e:
         print(f"Error: {e}")
+        record_fallback("generate_reflection", state)
         state["reflection"] = "That sounds tough. Thanks for sharing."
     
     return state
+
+
+def route_input(state: Dict[str, Any]) -> str:
+    if estimate_tokens(state.get("user_input", "")) > LONG_INPUT_TOKENS:
+        return "long"
+    return "short"
+
+
+def analyze_long_input(state: Dict[str, Any]) -> Dict[str, Any]:
+    user_input = state.get("user_input", "")
+    
+    chunks = chunk_text(user_input, CHUNK_TOKENS) or [user_input]
+    per_chunk = 3 * CHUNK_TOKENS + MAP_TEMPLATE_TOKENS
+    reflection_cost = CHUNK_TOKENS + REFLECTION_TEMPLATE_TOKENS
+    max_chunks = max(1, (MAX_PROMPT_TOKENS - reflection_cost) // per_chunk)
+    selected = select_chunks(chunks, max_chunks)
+    
+    shared = {key: state[key] for key in ("user_id", "priority") if key in state}
+    
+    def analyze_chunk(chunk: str) -> Dict[str, Any]:
+        chunk_state = {"user_input": chunk, **shared}
+        for node in (extract_emotion, generate_scores, extract_keywords):
+            chunk_state = node(chunk_state)
+        return chunk_state
+    
+    with ThreadPoolExecutor(max_workers=min(len(selected), MAX_PARALLEL_CHUNKS)) as executor:
+        results = list(executor.map(analyze_chunk, selected))
+    
+    weights = [estimate_tokens(chunk) for chunk in selected]
+    state.update(reduce_results(results, weights))
+    
+    # Reflect on the largest chunk that carries the overall emotion
+    state["reflection_input"] = max(
+        (weight, chunk)
+        for result, weight, chunk in zip(results, weights, selected)
+        if result["emotion"] == state["emotion"]
+    )[1]
+    state["prompt_tokens"] = state.get("prompt_tokens", 0) + sum(r.get("prompt_tokens", 0) for r in results)
+    state["chunk_count"] = len(chunks)
+    state["chunks_analyzed"] = len(selected)
+    
+    return state
@@ -0,0 +1,301 @@
+"""
+Per-node model routing for Groq completions
+Each node declares a latency budget and a ranked list of models; the router
+picks the first one whose recent latency, error rate and load fit the budget,
+falling through to the node's local fallback when none do. The budget also
+bounds each call: rate limit waits and request timeouts share what is left.
+A skipped model is probed with a single call once PROBE_SECONDS pass, so it
+can recover without waiting for its bad samples to age out of the window.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Any, List, Optional
+from ai.chunking import estimate_tokens
+from ai.scheduler import GroqScheduler, SchedulerTimeout, INTERACTIVE
+
+
+LOCAL = "local"
+
+WINDOW_SECONDS = 60.0
+MIN_SAMPLES = 5
+MAX_ERROR_RATE = 0.5
+DEFAULT_MAX_INFLIGHT = 16
+PROBE_SECONDS = 10.0
+
+
+class LocalFallback(Exception):
+    """Raised when routing chose the node's local fallback instead of a model"""
+
+
+class ModelStats:
+    """Rolling window of latencies and outcomes for one node's use of a model"""
+
+    def __init__(self, window: float = WINDOW_SECONDS):
+        self.window = window
+        self.samples: deque = deque()
+
+    def _prune(self, now: float) -> None:
+        while self.samples and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """
+        Add a sample to the window
+
+        Args:
+            latency: Seconds the call took
+            ok: False if the call failed; counts towards the error rate
+        """
+        now = time.monotonic()
+        self.samples.append((now, latency, ok))
+        self._prune(now)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the current window
+
+        Returns:
+            Dict with sample count, error rate and p90 latency (ms)
+        """
+        self._prune(time.monotonic())
+        latencies = sorted(s[1] for s in self.samples if s[2])
+        errors = sum(1 for s in self.samples if not s[2])
+        p90 = latencies[int(0.9 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+        return {
+            "samples": len(self.samples),
+            "error_rate": errors / len(self.samples) if self.samples else 0.0,
+            "p90_ms": p90,
+        }
+
+
+class ModelRouter:
+    """Chooses and calls a model for each node based on observed performance"""
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]], client_factory: Callable[[], Any],
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                 scheduler: Optional[GroqScheduler] = None):
+        """
+        Args:
+            routes: Node name -> {"budget_ms", "models", "max_tokens"}
+            client_factory: Returns a Groq client
+            max_inflight: Concurrent calls per model before downgrading
+            scheduler: Shared rate limiter every call must pass through
+        """
+        self.routes = routes
+        self.client_factory = client_factory
+        self.max_inflight = max_inflight
+        self.scheduler = scheduler
+        # Latency and errors are tracked per (node, model) since prompts and
+        # max_tokens differ per node; in-flight load is shared per model
+        self._stats: Dict[tuple, ModelStats] = {}
+        self._inflight: Counter = Counter()
+        self._decisions: Counter = Counter()
+        # (node, model) -> when it was first skipped or last probed
+        self._skipped_since: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _model_stats(self, node: str, model: str) -> ModelStats:
+        if (node, model) not in self._stats:
+            self._stats[(node, model)] = ModelStats()
+        return self._stats[(node, model)]
+
+    def _skip_reason(self, node: str, model: str, budget_ms: float,
+                     has_alternative: bool) -> Optional[str]:
+        summary = self._model_stats(node, model).summary()
+        if summary["samples"] >= MIN_SAMPLES and summary["error_rate"] > MAX_ERROR_RATE:
+            return "errors"
+        # Slow or busy is still better than the made-up local defaults, so
+        # only downgrade when another real model is left to try
+        if not has_alternative:
+            return None
+        if summary["samples"] >= MIN_SAMPLES and summary["p90_ms"] > budget_ms:
+            return "latency"
+        if self._inflight[model] >= self.max_inflight:
+            return "load"
+        return None
+
+    def _probe_due(self, node: str, model: str) -> bool:
+        # Half-open: a skipped model records no new samples, so let one call
+        # through per PROBE_SECONDS to find out whether it has recovered
+        now = time.monotonic()
+        since = self._skipped_since.setdefault((node, model), now)
+        if now - since < PROBE_SECONDS:
+            return False
+        self._skipped_since[(node, model)] = now
+        return True
+
+    def select(self, node: str, exclude: tuple = ()) -> str:
+        """
+        Pick the highest ranked model that currently fits the node's budget
+
+        Args:
+            node: Node name
+            exclude: Models already tried for this call
+
+        Returns:
+            Model name, or LOCAL
+        """
+        route = self.routes[node]
+        candidates = []
+        for model in route["models"]:
+            if model == LOCAL:
+                break
+            if model not in exclude:
+                candidates.append(model)
+
+        with self._lock:
+            for i, model in enumerate(candidates):
+                has_alternative = i + 1 < len(candidates)
+                reason = self._skip_reason(node, model, route["budget_ms"], has_alternative)
+                outcome = "selected"
+                if reason is None:
+                    self._skipped_since.pop((node, model), None)
+                elif reason != "load" and self._probe_due(node, model):
+                    outcome = "probe"
+                else:
+                    self._decisions[(node, model, f"skipped_{reason}")] += 1
+                    continue
+                self._decisions[(node, model, outcome)] += 1
+                self._inflight[model] += 1
+                return model
+            self._decisions[(node, LOCAL, "selected")] += 1
+            return LOCAL
+
+    def complete(self, node: str, prompt: str, temperature: float,
+                 user: str = "anonymous", priority: int = INTERACTIVE,
+                 usage: Optional[Dict[str, int]] = None) -> str:
+        """
+        Run a chat completion for a node, falling down its model list on errors
+
+        Args:
+            node: Node name
+            prompt: User prompt
+            temperature: Sampling temperature
+            user: Caller identity for fair scheduling
+            priority: Scheduler priority class
+            usage: If given, "prompt_tokens" is increased for every request sent,
+                including retries on another model
+
+        Returns:
+            Stripped completion text
+
+        Raises:
+            LocalFallback: If no model is available within the budget
+        """
+        route = self.routes[node]
+        started = time.monotonic()
+        tried: List[str] = []
+        last_error: Optional[Exception] = None
+
+        budget = route["budget_ms"] / 1000
+        prompt_tokens = estimate_tokens(prompt)
+
+        def remaining() -> float:
+            return budget - (time.monotonic() - started)
+
+        while remaining() > 0:
+            model = self.select(node, exclude=tuple(tried))
+            if model == LOCAL:
+                break
+            tried.append(model)
+
+            if self.scheduler is not None:
+                try:
+                    self.scheduler.acquire(model, prompt_tokens + route["max_tokens"],
+                                           user, priority, max_wait=remaining())
+                except SchedulerTimeout as e:
+                    with self._lock:
+                        self._inflight[model] -= 1
+                        self._decisions[(node, model, "rate_limited")] += 1
+                    last_error = e
+                    continue
+
+            if usage is not None:
+                usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+            call_started = time.monotonic()
+            call_timeout = max(remaining(), 0.001)
+            ok = False
+            try:
+                response = self.client_factory().chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=route["max_tokens"],
+                    timeout=call_timeout
+                )
+                ok = True
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                last_error = e
+            finally:
+                latency = time.monotonic() - call_started
+                # A call cut off by our own budget says the model is slow, not
+                # failing, so it counts as a latency sample rather than an error
+                timed_out = latency >= 0.9 * call_timeout
+                with self._lock:
+                    self._inflight[model] -= 1
+                    stats = self._model_stats(node, model)
+                    if ok and latency * 1000 <= route["budget_ms"] and \
+                            self._skipped_since.pop((node, model), None) is not None:
+                        # A healthy probe closes the circuit: start a fresh window
+                        stats.samples.clear()
+                    stats.record(latency, ok or timed_out)
+
+        raise LocalFallback(f"No model available for {node}") from last_error
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot routing decisions and per-model rolling stats
+
+        Returns:
+            Dict with "decisions" ("node/model/outcome" -> count), "models"
+            ("node/model" -> rolling stats), in-flight calls per model and
+            the scheduler's queue wait stats
+        """
+        with self._lock:
+            return {
+                "decisions": {"/".join(key): count for key, count in sorted(self._decisions.items())},
+                "models": {"/".join(key): stats.summary() for key, stats in sorted(self._stats.items())},
+                "inflight": dict(self._inflight),
+                "scheduler": self.scheduler.metrics() if self.scheduler is not None else {},
+            }
+
+
+def load_routes(defaults: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Apply configuration overrides to the nodes' default routes
+
+    A JSON file named by EMOTION_ROUTING_CONFIG may override any node's
+    budget_ms, models or max_tokens; EMOTION_ROUTE_<NODE>_BUDGET_MS,
+    EMOTION_ROUTE_<NODE>_MODELS (comma separated) and
+    EMOTION_ROUTE_<NODE>_MAX_TOKENS take precedence over the file.
+
+    Args:
+        defaults: Node name -> default route
+
+    Returns:
+        Node name -> effective route
+    """
+    routes = {node: dict(route) for node, route in defaults.items()}
+
+    config_path = os.getenv("EMOTION_ROUTING_CONFIG")
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            for node, overrides in json.load(f).items():
+                if node in routes:
+                    routes[node].update(overrides)
+
+    for node, route in routes.items():
+        prefix = f"EMOTION_ROUTE_{node.upper()}_"
+        if os.getenv(prefix + "BUDGET_MS"):
+            route["budget_ms"] = float(os.getenv(prefix + "BUDGET_MS"))
+        if os.getenv(prefix + "MODELS"):
+            route["models"] = [m.strip() for m in os.getenv(prefix + "MODELS").split(",") if m.strip()]
+        if os.getenv(prefix + "MAX_TOKENS"):
+            route["max_tokens"] = int(os.getenv(prefix + "MAX_TOKENS"))
+
+    return routes
@@ -0,0 +1,237 @@
+"""
+Shared rate limiting and priority scheduling for Groq calls
+Token buckets for requests and tokens per minute live in a SQLite file so
+every session, worker and process on the host draws from the same budget;
+waiters in this process are served by priority class, then fairly per user
+"""
+
+import heapq
+import itertools
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+INTERACTIVE = 0
+REFLECTION = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REFLECTION: "reflection", BACKGROUND: "background"}
+
+# Share of each bucket lower classes must leave untouched, so other
+# processes' interactive calls still find capacity during a burst
+RESERVE = {INTERACTIVE: 0.0, REFLECTION: 0.1, BACKGROUND: 0.25}
+
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+DEFAULT_MAX_WAIT = 30.0
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a call waited longer than max_wait for rate limit capacity"""
+
+
+class TokenBuckets:
+    """Requests-per-minute and tokens-per-minute buckets stored in SQLite"""
+
+    def __init__(self, path: str, rpm: int, tpm: int):
+        self.path = path
+        self.capacity = {"requests": float(rpm), "tokens": float(tpm)}
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_take(self, key: str, tokens: int, reserve: float = 0.0) -> float:
+        """
+        Take one request and `tokens` tokens for `key` if both buckets allow it
+
+        Args:
+            key: Bucket namespace, e.g. the model name
+            tokens: Estimated tokens for the call
+            reserve: Fraction of capacity that must remain after taking
+
+        Returns:
+            0.0 if taken, otherwise seconds until enough capacity refills
+        """
+        # Never ask for more than the bucket can hold above the reserve
+        need = {"requests": 1.0,
+                "tokens": float(min(tokens, self.capacity["tokens"] * (1 - reserve)))}
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            for kind, capacity in self.capacity.items():
+                row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?",
+                                   (f"{key}:{kind}",)).fetchone()
+                level, updated = row if row else (capacity, now)
+                levels[kind] = min(capacity, level + (now - updated) * capacity / 60)
+
+            wait = 0.0
+            for kind, capacity in self.capacity.items():
+                # Keep the reserve satisfiable even for tiny buckets
+                floor = min(capacity * reserve, capacity - need[kind])
+                shortfall = need[kind] + floor - levels[kind]
+                if shortfall > 0:
+                    wait = max(wait, shortfall * 60 / capacity)
+
+            if wait == 0.0:
+                for kind in self.capacity:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                        (f"{key}:{kind}", levels[kind] - need[kind], now)
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class GroqScheduler:
+    """
+    Admits Groq calls in priority order under the shared rate limits
+
+    Each bucket key (model) has its own queue, so an exhausted model never
+    holds up calls to another. Within a key and priority class, users are
+    served by start-time fair queuing: each waiter is tagged one step after
+    the later of the class's virtual clock and that user's previous tag, so
+    a heavy user queues behind everyone else's next call instead of in
+    front of it.
+    """
+
+    def __init__(self, path: Optional[str] = None, rpm: Optional[int] = None,
+                 tpm: Optional[int] = None, max_wait: Optional[float] = None):
+        """
+        Args:
+            path: SQLite file for shared buckets (EMOTION_RATE_LIMIT_DB)
+            rpm: Requests per minute per model (EMOTION_GROQ_RPM, default 30)
+            tpm: Tokens per minute per model (EMOTION_GROQ_TPM, default 6000)
+            max_wait: Seconds to wait before giving up (EMOTION_GROQ_MAX_WAIT, default 30)
+        """
+        path = path or os.getenv("EMOTION_RATE_LIMIT_DB") or os.path.join(
+            tempfile.gettempdir(), "emotion-groq-limits.sqlite3")
+        self.buckets = TokenBuckets(
+            path,
+            rpm or int(os.getenv("EMOTION_GROQ_RPM", DEFAULT_RPM)),
+            tpm or int(os.getenv("EMOTION_GROQ_TPM", DEFAULT_TPM))
+        )
+        self.max_wait = max_wait or float(os.getenv("EMOTION_GROQ_MAX_WAIT", DEFAULT_MAX_WAIT))
+
+        self._cond = threading.Condition()
+        self._heaps: Dict[str, list] = {}
+        self._taking: set = set()
+        self._seq = itertools.count()
+        self._vclock: Dict[tuple, int] = {}
+        self._last_tag: Dict[tuple, int] = {}
+        self._waits = {priority: deque(maxlen=200) for priority in PRIORITY_NAMES}
+        self._timeouts = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def acquire(self, key: str, tokens: int, user: str = "anonymous",
+                priority: int = INTERACTIVE, max_wait: Optional[float] = None) -> float:
+        """
+        Block until the call may be sent
+
+        Args:
+            key: Bucket namespace, normally the model name
+            tokens: Estimated prompt plus completion tokens
+            user: Caller identity for fair queuing
+            priority: INTERACTIVE, REFLECTION or BACKGROUND
+            max_wait: Caller's own deadline in seconds, capped at self.max_wait
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            SchedulerTimeout: If capacity did not free up within max_wait
+        """
+        started = time.monotonic()
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        with self._cond:
+            heap = self._heaps.setdefault(key, [])
+            clock = (key, priority)
+            tag = max(self._vclock.get(clock, 0), self._last_tag.get((key, priority, user), 0)) + 1
+            self._last_tag[(key, priority, user)] = tag
+            entry = (priority, tag, next(self._seq))
+            heapq.heappush(heap, entry)
+            self._cond.notify_all()
+
+            try:
+                while True:
+                    remaining = limit - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._timeouts[priority] += 1
+                        raise SchedulerTimeout(
+                            f"Waited {limit:.1f}s for Groq rate limit capacity"
+                        )
+                    if heap[0] is not entry or key in self._taking:
+                        self._cond.wait(timeout=remaining)
+                        continue
+                    # The bucket transaction may wait on other processes'
+                    # SQLite locks, so other keys' waiters must not be held
+                    # up meanwhile; the taking mark keeps this key serial
+                    self._taking.add(key)
+                    self._cond.release()
+                    try:
+                        wait = self.buckets.try_take(key, tokens, RESERVE[priority])
+                    finally:
+                        self._cond.acquire()
+                        self._taking.discard(key)
+                        self._cond.notify_all()
+                    if wait == 0.0:
+                        self._vclock[clock] = tag
+                        break
+                    self._cond.wait(timeout=min(wait, remaining))
+            finally:
+                heap.remove(entry)
+                heapq.heapify(heap)
+                if not heap:
+                    self._forget(key)
+                self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        self._waits[priority].append(waited)
+        return waited
+
+    def _forget(self, key: str) -> None:
+        # With nobody waiting on a key, per-user tags only differ from the
+        # class clock for users who timed out, so they can all be dropped
+        del self._heaps[key]
+        for tag_key in [k for k in self._last_tag if k[0] == key]:
+            del self._last_tag[tag_key]
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Queue depth and recent wait times per priority class
+
+        Returns:
+            Dict keyed by class name with queued, p50_wait_ms, p95_wait_ms and timeouts
+        """
+        with self._cond:
+            queued = {priority: 0 for priority in PRIORITY_NAMES}
+            for heap in self._heaps.values():
+                for priority, _, _ in heap:
+                    queued[priority] += 1
+            result = {}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self._waits[priority])
+                result[name] = {
+                    "queued": queued[priority],
+                    "p50_wait_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+                    "p95_wait_ms": waits[int(0.95 * (len(waits) - 1))] * 1000 if waits else 0.0,
+                    "timeouts": self._timeouts[priority],
+                }
+            return result
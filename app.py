@@ -2,11 +2,13 @@
 EmotionS - Emotion Tracking Application
 """
 
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
-from ai.graph import create_emotion_graph
+from ai.jobs import AnalysisJobQueue, QueueFullError
+from ai.nodes import get_router
 from utils.storage import EmotionStorage
-from utils.charts import create_mood_timeline, create_emotion_donut, create_score_bars
+from utils.charts import create_mood_timeline_from_series, create_emotion_donut, create_score_bars
 
 load_dotenv()
 
@@ -140,12 +142,23 @@ st.markdown("""
 if 'storage' not in st.session_state:
     st.session_state.storage = EmotionStorage()
 
-if 'workflow' not in st.session_state:
-    st.session_state.workflow = create_emotion_graph()
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+
+if 'pending_jobs' not in st.session_state:
+    st.session_state.pending_jobs = []
+    st.session_state.job_errors = []
 
 if 'last_result' not in st.session_state:
     st.session_state.last_result = None
 
+if 'analytics' not in st.session_state:
+    st.session_state.analytics = None
+
+if 'export_version' not in st.session_state:
+    st.session_state.export_version = None
+    st.session_state.export_data = None
+
 st.markdown("""
 <div class="main-header">
     <h1>💭 EmotionS</h1>
@@ -153,9 +166,29 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-col1, col2 = st.columns([1, 1])
 
-with col1:
+@st.cache_resource
+def get_job_queue() -> AnalysisJobQueue:
+    """One analysis worker pool shared by every session in this process"""
+    return AnalysisJobQueue()
+
+
+def get_analytics(storage: EmotionStorage) -> dict:
+    """Return insights and charts, recomputed only when the storage version changes"""
+    cached = st.session_state.analytics
+    if cached is None or cached["version"] != storage.version:
+        cached = {
+            "version": storage.version,
+            "insights": storage.get_insights(),
+            "timeline": create_mood_timeline_from_series(storage.get_mood_series()),
+            "donut": create_emotion_donut(storage.get_emotion_counts())
+        }
+        st.session_state.analytics = cached
+    return cached
+
+
+@st.fragment
+def input_panel():
     st.markdown("### 📝 How are you feeling today?")
     st.markdown("Write freely about your emotions, thoughts, and experiences.")
     
@@ -169,33 +202,58 @@ with col1:
     analyze_button = st.button("🔍 Analyze My Mood", width="stretch")
     
     if analyze_button and user_input.strip():
-        with st.spinner("✨ Analyzing your emotions..."):
-            try:
-                initial_state = {"user_input": user_input}
-                result = st.session_state.workflow.invoke(initial_state)
-                
-                st.session_state.storage.add_entry(
-                    user_input=result["user_input"],
-                    emotion=result["emotion"],
-                    mood_score=result["mood_score"],
-                    energy_score=result["energy_score"],
-                    stress_score=result["stress_score"],
-                    keywords=result["keywords"],
-                    reflection=result["reflection"]
-                )
-                
-                st.session_state.last_result = result
-                st.success("✅ Analysis complete!")
-                st.rerun()
-                
-            except Exception as e:
-                st.error(f"❌ Error during analysis: {str(e)}")
-                st.info("💡 Make sure your GROQ_API_KEY is set in the .env file")
+        try:
+            job = get_job_queue().submit(user_input, user_id=st.session_state.user_id)
+        except QueueFullError:
+            st.warning("⏳ We're busy analyzing a lot of entries right now. Please try again in a moment.")
+        else:
+            pending_jobs = st.session_state.pending_jobs
+            pending_jobs.append(job)
+            st.success("✨ Entry queued for analysis!")
+            # Start the job poller, which is only rendered while jobs are pending
+            if len(pending_jobs) == 1:
+                st.rerun(scope="app")
     
     elif analyze_button:
         st.warning("⚠️ Please write something before analyzing!")
 
-with col2:
+
+@st.fragment(run_every=1.0)
+def job_poller():
+    pending_jobs = st.session_state.pending_jobs
+    changed = False
+    
+    # Commit finished results in submission order
+    while pending_jobs and pending_jobs[0].finished:
+        job = pending_jobs.pop(0)
+        if job.status == "failed":
+            st.session_state.job_errors.append(job.error)
+            changed = True
+            continue
+        
+        result = job.result
+        st.session_state.storage.add_entry(
+            user_input=result["user_input"],
+            emotion=result["emotion"],
+            mood_score=result["mood_score"],
+            energy_score=result["energy_score"],
+            stress_score=result["stress_score"],
+            keywords=result["keywords"],
+            reflection=result["reflection"]
+        )
+        st.session_state.last_result = result
+        changed = True
+    
+    if changed or not pending_jobs:
+        # The snapshot and analytics fragments live outside this one
+        st.rerun(scope="app")
+    
+    st.caption(f"✨ Analyzing {len(pending_jobs)} "
+               f"{'entry' if len(pending_jobs) == 1 else 'entries'}...")
+
+
+@st.fragment
+def snapshot_panel():
     st.markdown("### 🎯 Your Emotional Snapshot")
     
     if st.session_state.last_result:
@@ -223,42 +281,116 @@ with col2:
         st.markdown("#### 💬 Supportive Message")
         st.info(result['reflection'])
         
+        if result.get('chunk_count'):
+            st.caption(f"📄 Long entry: analyzed {result['chunks_analyzed']} of "
+                       f"{result['chunk_count']} sections · ~{result['prompt_tokens']} prompt tokens")
+        
     else:
         st.info("👈 Enter your thoughts and click 'Analyze My Mood' to get started!")
 
-st.markdown("---")
-st.markdown("## 📈 Your Emotion Analytics")
 
-if st.session_state.storage.get_entry_count() > 0:
-    st.markdown("### 💡 Insights")
-    st.markdown(st.session_state.storage.get_insights())
+@st.fragment
+def analytics_panel():
+    storage = st.session_state.storage
     
-    chart_col1, chart_col2 = st.columns(2)
+    if storage.get_entry_count() > 0:
+        analytics = get_analytics(storage)
+        
+        st.markdown("### 💡 Insights")
+        st.markdown(analytics["insights"])
+        
+        chart_col1, chart_col2 = st.columns(2)
+        
+        with chart_col1:
+            st.markdown("#### Mood Timeline")
+            st.plotly_chart(analytics["timeline"], width="stretch")
+        
+        with chart_col2:
+            st.markdown("#### Emotion Distribution")
+            st.plotly_chart(analytics["donut"], width="stretch")
+        
+        st.markdown("### 💾 Export Your Data")
+        # Serializing the whole journal is only worth it once the user asks
+        if st.session_state.export_version != storage.version:
+            if st.button("📦 Prepare JSON Export", width="stretch"):
+                st.session_state.export_data = storage.export_to_json()
+                st.session_state.export_version = storage.version
+                st.rerun(scope="fragment")
+        else:
+            st.download_button(
+                label="📥 Download Data as JSON",
+                data=st.session_state.export_data,
+                file_name="journal-entries.json",
+                mime="application/json",
+                width="stretch"
+            )
+        
+    else:
+        st.info("📊 Start tracking your emotions to see analytics and insights!")
+
+
+@st.fragment(run_every=10.0)
+def system_status_panel():
+    # Queue waits and routing decisions, to spot rate limit saturation
+    metrics = get_router().metrics()
+    job_queue = get_job_queue()
     
-    with chart_col1:
-        st.markdown("#### Mood Timeline")
-        mood_data = st.session_state.storage.get_mood_timeline()
-        fig_timeline = create_mood_timeline(mood_data)
-        st.plotly_chart(fig_timeline, width="stretch")
+    st.markdown(f"**Analysis queue:** {job_queue.outstanding}/{job_queue.max_depth} jobs outstanding")
     
-    with chart_col2:
-        st.markdown("#### Emotion Distribution")
-        emotion_counts = st.session_state.storage.get_emotion_counts()
-        fig_donut = create_emotion_donut(emotion_counts)
-        st.plotly_chart(fig_donut, width="stretch")
+    st.markdown("**Rate limit queue**")
+    st.table([
+        {
+            "class": name,
+            "queued": waits["queued"],
+            "p50 wait (ms)": round(waits["p50_wait_ms"]),
+            "p95 wait (ms)": round(waits["p95_wait_ms"]),
+            "timeouts": waits["timeouts"]
+        }
+        for name, waits in metrics["scheduler"].items()
+    ])
     
-    st.markdown("### 💾 Export Your Data")
-    json_data = st.session_state.storage.export_to_json()
-    st.download_button(
-        label="📥 Download Data as JSON",
-        data=json_data,
-        file_name="journal-entries.json",
-        mime="application/json",
-        width="stretch"
-    )
+    st.markdown("**Model routing**")
+    if metrics["decisions"]:
+        st.table([
+            {"node/model/decision": decision, "count": count}
+            for decision, count in metrics["decisions"].items()
+        ])
+        st.table([
+            {
+                "node/model": key,
+                "samples": stats["samples"],
+                "error rate": f"{stats['error_rate']:.0%}",
+                "p90 (ms)": round(stats["p90_ms"])
+            }
+            for key, stats in metrics["models"].items()
+        ])
+    else:
+        st.caption("No model calls yet.")
+
+
+col1, col2 = st.columns([1, 1])
+
+with col1:
+    input_panel()
     
-else:
-    st.info("📊 Start tracking your emotions to see analytics and insights!")
+    if st.session_state.pending_jobs:
+        job_poller()
+    
+    for error in st.session_state.job_errors:
+        st.error(f"❌ Error during analysis: {error}")
+        st.info("💡 Make sure your GROQ_API_KEY is set in the .env file")
+    st.session_state.job_errors = []
+
+with col2:
+    snapshot_panel()
+
+st.markdown("---")
+st.markdown("## 📈 Your Emotion Analytics")
+
+analytics_panel()
+
+with st.expander("⚙️ System Status"):
+    system_status_panel()
 
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,103 @@
+"""
+Benchmark history load time and memory: JSON export vs columnar snapshot
+
+Usage:
+    python -m benchmarks.snapshot_load --entries 200000
+
+Data generation and each load run in their own subprocess: Linux carries
+a parent's peak RSS across fork/exec, so the driver itself must stay small.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.storage import EmotionStorage
+
+
+EMOTIONS = ["Happy", "Sad", "Angry", "Anxious", "Stressed", "Tired", "Excited", "Lonely"]
+
+
+def generate(directory: str, count: int) -> None:
+    rng = random.Random(0)
+    storage = EmotionStorage()
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        storage.entries.append({
+            "timestamp": (base + timedelta(seconds=61 * i)).isoformat(),
+            "user_input": "I had a long day at work and feel a bit drained but okay. " * 2,
+            "emotion": rng.choice(EMOTIONS),
+            "mood_score": rng.randint(1, 5),
+            "energy_score": rng.randint(1, 5),
+            "stress_score": rng.randint(1, 5),
+            "keywords": ["drained", "okay", "work"],
+            "reflection": "That sounds tiring. Maybe take a short break and breathe. Be kind to yourself."
+        })
+    with open(os.path.join(directory, "history.json"), "w", encoding="utf-8") as f:
+        f.write(storage.export_to_json())
+    storage.save_snapshot(os.path.join(directory, "snapshot"))
+
+
+def measure(directory: str, mode: str) -> None:
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if mode == "json":
+        storage = EmotionStorage()
+        with open(os.path.join(directory, "history.json"), encoding="utf-8") as f:
+            storage.entries = json.load(f)
+    else:
+        storage = EmotionStorage.load_snapshot(os.path.join(directory, "snapshot"))
+    loaded = time.perf_counter()
+    storage.get_insights()
+    # The same series the app's timeline chart is built from
+    storage.get_mood_series()
+    finished = time.perf_counter()
+    # ru_maxrss is KiB on Linux
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+    print(json.dumps({
+        "mode": mode,
+        "load_ms": (loaded - started) * 1000,
+        "analytics_ms": (finished - loaded) * 1000,
+        "rss_mb": rss_mb
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs snapshot history load benchmark")
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--generate", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--measure", choices=["json", "snapshot"], help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.dir, args.entries)
+        return
+    if args.measure:
+        measure(args.dir, args.measure)
+        return
+
+    command = [sys.executable, "-m", "benchmarks.snapshot_load"]
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run(command + ["--generate", "--entries", str(args.entries), "--dir", directory],
+                       check=True)
+        print(f"{args.entries} entries")
+        print(f"{'mode':<10}{'load ms':>10}{'analytics ms':>14}{'+RSS MB':>10}")
+        for mode in ("json", "snapshot"):
+            output = subprocess.run(
+                command + ["--measure", mode, "--dir", directory],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output)
+            print(f"{mode:<10}{result['load_ms']:>10.1f}{result['analytics_ms']:>14.1f}{result['rss_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
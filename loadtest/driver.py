@@ -0,0 +1,190 @@
+"""
+Load generator for the emotion analysis pipeline
+Simulates concurrent users running create_emotion_graph plus storage
+writes, and reports throughput, latency percentiles, error/fallback rates
+and model routing decisions
+
+Usage:
+    python -m loadtest.driver --users 20 --entries 5 --latency lognormal:250:0.5 --rate-429 0.05
+    python -m loadtest.driver --base-url http://127.0.0.1:8765   # external stub
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+
+SAMPLE_ENTRIES = [
+    "I'm feeling a bit overwhelmed today. Work has been really stressful and I can't seem to focus.",
+    "Had a great walk with my friend this morning, I feel light and happy.",
+    "Couldn't sleep again last night and I'm dragging through the day.",
+    "Everyone seems busy and I haven't talked to anyone in days.",
+    "Got the offer I was hoping for! Still can't believe it.",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(users: int, entries_per_user: int, base_url: str,
+             priority: str = "interactive", max_retries: int = 0,
+             rpm: int = 1_000_000, tpm: int = 1_000_000_000) -> dict:
+    """
+    Run the full pipeline for every simulated user concurrently
+
+    Args:
+        users: Number of concurrent users
+        entries_per_user: Entries each user analyzes back to back
+        base_url: Groq-compatible endpoint to send completions to
+        priority: "interactive", or "background" to run as bulk work
+        max_retries: Groq SDK retries per call; 0 so injected faults show up
+        rpm: Scheduler requests-per-minute limit, effectively off by default
+        tpm: Scheduler tokens-per-minute limit, effectively off by default
+
+    Returns:
+        Dict of raw latencies, error count, fallback counts and wall time
+    """
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_API_KEY", "stub-key")
+    os.environ["GROQ_MAX_RETRIES"] = str(max_retries)
+    # Use private rate limit buckets so a stub run neither inherits nor
+    # drains the budget of a live app on the same host
+    limits_dir = tempfile.mkdtemp(prefix="emotion-loadtest-")
+    os.environ["EMOTION_RATE_LIMIT_DB"] = os.path.join(limits_dir, "limits.sqlite3")
+    os.environ["EMOTION_GROQ_RPM"] = str(rpm)
+    os.environ["EMOTION_GROQ_TPM"] = str(tpm)
+
+    # Imported late so the environment above is in place first
+    from ai.graph import create_emotion_graph
+    from ai.nodes import FALLBACK_COUNTS, get_router
+    from utils.storage import EmotionStorage
+
+    workflow = create_emotion_graph()
+    fallbacks_before = FALLBACK_COUNTS.copy()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def user_session(user_id: str):
+        nonlocal errors
+        storage = EmotionStorage()
+        for _ in range(entries_per_user):
+            started = time.perf_counter()
+            try:
+                result = workflow.invoke({
+                    "user_input": random.choice(SAMPLE_ENTRIES),
+                    "user_id": user_id,
+                    "priority": priority
+                })
+                storage.add_entry(
+                    user_input=result["user_input"],
+                    emotion=result["emotion"],
+                    mood_score=result["mood_score"],
+                    energy_score=result["energy_score"],
+                    stress_score=result["stress_score"],
+                    keywords=result["keywords"],
+                    reflection=result["reflection"]
+                )
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=user_session, args=(f"loadtest-{i}",))
+               for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "fallbacks": FALLBACK_COUNTS - fallbacks_before,
+        "wall_time": wall_time,
+        "requested": users * entries_per_user,
+        "routing": get_router().metrics(),
+    }
+
+
+def print_report(stats: dict, stub_status: Optional[dict] = None) -> None:
+    latencies = sorted(stats["latencies"])
+    completed = len(latencies)
+    requested = stats["requested"]
+    node_calls = requested * 4
+    fallback_total = sum(stats["fallbacks"].values())
+    if requested == 0:
+        print("Entries:      none requested")
+        return
+
+    print(f"Entries:      {completed}/{requested} completed in {stats['wall_time']:.2f}s")
+    print(f"Throughput:   {completed / stats['wall_time']:.2f} entries/s")
+    print("Latency (s):  " + "  ".join(
+        f"p{p}={percentile(latencies, p):.3f}" for p in (50, 90, 95, 99)
+    ) + f"  max={latencies[-1] if latencies else 0:.3f}")
+    print(f"Errors:       {stats['errors']} ({stats['errors'] / requested:.1%})")
+    print(f"Fallbacks:    {fallback_total} of ~{node_calls} node calls ({fallback_total / node_calls:.1%})")
+    for node, count in sorted(stats["fallbacks"].items()):
+        print(f"  {node}: {count}")
+    print("Scheduler:")
+    for name, waits in stats["routing"]["scheduler"].items():
+        print(f"  {name}: p50 wait {waits['p50_wait_ms']:.0f} ms, "
+              f"p95 wait {waits['p95_wait_ms']:.0f} ms, timeouts {waits['timeouts']}")
+    print("Routing:")
+    for decision, count in stats["routing"]["decisions"].items():
+        print(f"  {decision}: {count}")
+    if stub_status:
+        print("Stub HTTP:    " + ", ".join(f"{k}={v}" for k, v in sorted(stub_status.items(), key=lambda item: str(item[0]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emotion pipeline load generator")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=5, help="Entries per user")
+    parser.add_argument("--base-url", help="Use an already running endpoint instead of an in-process stub")
+    parser.add_argument("--latency", default="lognormal:250:0.5", help="In-process stub latency spec")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--background", action="store_true", help="Schedule calls as background work")
+    parser.add_argument("--rpm", type=int, default=1_000_000,
+                        help="Scheduler requests-per-minute limit (default: effectively unlimited)")
+    parser.add_argument("--tpm", type=int, default=1_000_000_000,
+                        help="Scheduler tokens-per-minute limit (default: effectively unlimited)")
+    parser.add_argument("--max-retries", type=int, default=0,
+                        help="Groq SDK retries per call (the app default is 2)")
+    args = parser.parse_args()
+    if args.users < 1 or args.entries < 1:
+        parser.error("--users and --entries must be at least 1")
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from loadtest.groq_stub import start_stub
+        server = start_stub(latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx)
+        base_url = server.base_url
+
+    try:
+        stats = run_load(args.users, args.entries, base_url,
+                         "background" if args.background else "interactive", args.max_retries,
+                         args.rpm, args.tpm)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_report(stats, dict(server.status_counts) if server else None)
+
+
+if __name__ == "__main__":
+    main()
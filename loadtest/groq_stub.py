@@ -0,0 +1,204 @@
+"""
+Local Groq/OpenAI-compatible stub server for offline load testing
+Serves /openai/v1/chat/completions with configurable latency, injected
+429/5xx errors and canned replies in the formats ai/nodes.py parses
+
+Usage:
+    python -m loadtest.groq_stub --port 8765 --latency lognormal:250:0.5 --rate-429 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Any, Union
+
+
+EMOTIONS = ["Happy", "Sad", "Angry", "Anxious", "Stressed", "Tired", "Excited", "Lonely"]
+KEYWORDS = ["overwhelmed", "hopeful", "drained", "calm", "restless", "grateful", "tense", "lonely"]
+REFLECTIONS = [
+    "It makes sense you'd feel this way with so much going on. Maybe a short break could help. Be gentle with yourself today.",
+    "That sounds like a lot to carry. A few slow breaths might help a little. You deserve some kindness right now.",
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Build a latency sampler from a spec string
+
+    Args:
+        spec: One of fixed:MS, uniform:LOW_MS:HIGH_MS, exp:MEAN_MS or
+            lognormal:MEDIAN_MS:SIGMA
+
+    Returns:
+        Function returning a delay in seconds
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "exp" and len(values) == 1:
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def canned_reply(prompt: str) -> str:
+    """
+    Pick a reply matching the prompt of the node that sent it
+
+    Args:
+        prompt: User message content from the request
+
+    Returns:
+        Reply text in the format that node expects
+    """
+    if "pick ONE emotion" in prompt:
+        return random.choice(EMOTIONS)
+    if "Rate this on 1-5 scale" in prompt:
+        return "Mood: {}\nEnergy: {}\nStress: {}".format(*(random.randint(1, 5) for _ in range(3)))
+    if "emotional keywords" in prompt:
+        return ", ".join(random.sample(KEYWORDS, 3))
+    return random.choice(REFLECTIONS)
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP server holding the stub configuration and request counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency: Callable[[], float],
+                 rate_429: float = 0.0, rate_5xx: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.status_counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, status: Union[int, str]) -> None:
+        with self._lock:
+            self.status_counts[status] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first, e.g. the router's budget timeout
+            self.close_connection = True
+            self.server.record("client_closed")
+            return
+        self.server.record(status)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {str(k): v for k, v in self.server.status_counts.items()})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        time.sleep(self.server.latency())
+
+        roll = random.random()
+        if roll < self.server.rate_429:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}})
+            return
+        if roll < self.server.rate_429 + self.server.rate_5xx:
+            self._send_json(random.choice([500, 502, 503]), {"error": {"message": "Internal server error", "type": "internal_server_error"}})
+            return
+
+        prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+        content = canned_reply(prompt)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self._send_json(200, {
+            "id": f"chatcmpl-stub-{random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, latency: str = "fixed:0",
+               rate_429: float = 0.0, rate_5xx: float = 0.0) -> StubServer:
+    """
+    Start the stub server on a background thread
+
+    Args:
+        host: Interface to bind
+        port: Port to bind, 0 for any free port
+        latency: Latency spec, see parse_latency
+        rate_429: Fraction of requests answered with 429
+        rate_5xx: Fraction of requests answered with a 5xx error
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = StubServer((host, port), parse_latency(latency), rate_429, rate_5xx)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Groq-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:250:0.5",
+                        help="fixed:MS | uniform:LOW:HIGH | exp:MEAN | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), parse_latency(args.latency),
+                        args.rate_429, args.rate_5xx)
+    print(f"Groq stub listening on {server.base_url} (set GROQ_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
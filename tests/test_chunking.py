@@ -0,0 +1,45 @@
+"""
+Tests for long-input chunking and chunk result merging
+"""
+
+from ai.chunking import chunk_text, estimate_tokens, reduce_results, split_sentences
+
+
+def test_chunks_respect_budget_for_text_without_spaces():
+    for text in ("我今天很累。" * 3000, "x" * 5000):
+        chunks = chunk_text(text, 300)
+        assert len(chunks) > 1
+        assert max(estimate_tokens(c) for c in chunks) <= 300
+        # Sentences are rejoined with spaces; no content may be lost
+        assert "".join(chunks).replace(" ", "") == text
+
+
+def test_split_sentences_on_cjk_punctuation():
+    assert split_sentences("我很累。你呢？好！ Yes. no") == ["我很累。", "你呢？", "好！", "Yes.", "no"]
+
+
+def test_reduce_ignores_fallback_chunks():
+    fallback = {
+        "emotion": "Anxious", "mood_score": 3, "energy_score": 3, "stress_score": 3,
+        "keywords": ["thoughtful", "reflective", "aware"],
+        "fallbacks": ["extract_emotion", "generate_scores", "extract_keywords"]
+    }
+    real = {
+        "emotion": "Happy", "mood_score": 5, "energy_score": 4, "stress_score": 1,
+        "keywords": ["joy", "sun", "friends"]
+    }
+    merged = reduce_results([fallback, real], [1000, 10])
+    assert merged["emotion"] == "Happy"
+    assert (merged["mood_score"], merged["energy_score"], merged["stress_score"]) == (5, 4, 1)
+    assert merged["keywords"] == ["joy", "sun", "friends"]
+    assert merged["fallbacks"] == []
+
+
+def test_reduce_keeps_defaults_when_every_chunk_fell_back():
+    fallback = {
+        "emotion": "Anxious", "mood_score": 3, "energy_score": 3, "stress_score": 3,
+        "keywords": ["thoughtful", "reflective", "aware"], "fallbacks": ["extract_emotion"]
+    }
+    merged = reduce_results([fallback, dict(fallback)], [5, 5])
+    assert merged["emotion"] == "Anxious"
+    assert merged["fallbacks"] == ["extract_emotion"]
@@ -0,0 +1,76 @@
+"""
+Tests for the background analysis job queue
+"""
+
+import threading
+import time
+
+import pytest
+
+from ai.jobs import AnalysisJobQueue, QueueFullError
+
+
+class FakeWorkflow:
+    """Stands in for the compiled graph; blocks until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def invoke(self, state):
+        self.release.wait(timeout=5)
+        if state["user_input"] == "boom":
+            raise RuntimeError("analysis failed")
+        return {**state, "emotion": "Happy"}
+
+
+def make_queue(max_workers=2, max_depth=2):
+    queue = AnalysisJobQueue(max_workers=max_workers, max_depth=max_depth)
+    queue._workflow = FakeWorkflow()
+    return queue
+
+
+def wait_finished(jobs):
+    for _ in range(500):
+        if all(job.finished for job in jobs):
+            return
+        time.sleep(0.01)
+    raise AssertionError("Jobs did not finish")
+
+
+def test_backpressure_at_max_depth():
+    queue = make_queue(max_depth=2)
+    try:
+        jobs = [queue.submit("one"), queue.submit("two")]
+        with pytest.raises(QueueFullError):
+            queue.submit("three")
+
+        queue._workflow.release.set()
+        wait_finished(jobs)
+        assert [job.status for job in jobs] == ["done", "done"]
+        assert queue.outstanding == 0
+        queue.submit("four")
+    finally:
+        queue._workflow.release.set()
+        queue.shutdown()
+
+
+def test_failed_job_reports_error():
+    queue = make_queue()
+    queue._workflow.release.set()
+    try:
+        job = queue.submit("boom", user_id="u1")
+        wait_finished([job])
+        assert job.status == "failed"
+        assert job.error == "analysis failed"
+        assert job.result is None
+        assert queue.outstanding == 0
+    finally:
+        queue.shutdown()
+
+
+def test_submit_after_shutdown_releases_slot():
+    queue = make_queue()
+    queue.shutdown()
+    with pytest.raises(RuntimeError):
+        queue.submit("late")
+    assert queue.outstanding == 0
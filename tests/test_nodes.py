@@ -0,0 +1,45 @@
+"""
+Tests for fallback marking in the analysis nodes
+"""
+
+from ai import nodes
+from ai.chunking import reduce_results
+
+
+def reply_with(monkeypatch, text):
+    monkeypatch.setattr(nodes, "_complete", lambda node, state, prompt, **kwargs: text)
+
+
+def test_unparsable_scores_are_marked_as_fallback(monkeypatch):
+    reply_with(monkeypatch, "Mood: 4\nEnergy: high\nStress: 2")
+    state = nodes.generate_scores({"user_input": "fine"})
+    assert (state["mood_score"], state["energy_score"], state["stress_score"]) == (4, 3, 2)
+    assert state["fallbacks"] == ["generate_scores"]
+
+    reply_with(monkeypatch, "Mood: 4\nEnergy: 1\nStress: 2")
+    assert "fallbacks" not in nodes.generate_scores({"user_input": "fine"})
+
+
+def test_padded_keywords_are_marked_as_fallback(monkeypatch):
+    reply_with(monkeypatch, "tired")
+    state = nodes.extract_keywords({"user_input": "so tired"})
+    assert state["keywords"] == ["tired", "reflective", "reflective"]
+    assert state["fallbacks"] == ["extract_keywords"]
+
+    reply_with(monkeypatch, "tired, calm, hopeful")
+    assert "fallbacks" not in nodes.extract_keywords({"user_input": "so tired"})
+
+
+def test_marked_defaults_are_left_out_of_the_merge(monkeypatch):
+    results = []
+    for scores, keywords in (("Mood: 5\nEnergy: 5\nStress: 1", "joy, calm, light"),
+                             ("no idea", "tired")):
+        state = {"user_input": "chunk", "emotion": "Happy"}
+        reply_with(monkeypatch, scores)
+        state = nodes.generate_scores(state)
+        reply_with(monkeypatch, keywords)
+        results.append(nodes.extract_keywords(state))
+
+    merged = reduce_results(results, [10, 100])
+    assert (merged["mood_score"], merged["energy_score"], merged["stress_score"]) == (5, 5, 1)
+    assert merged["keywords"] == ["joy", "calm", "light"]
@@ -0,0 +1,126 @@
+"""
+Tests for per-node model routing
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ai import routing
+from ai.chunking import estimate_tokens
+from ai.routing import LOCAL, MIN_SAMPLES, LocalFallback, ModelRouter, load_routes
+
+
+class FakeClient:
+    """Groq client stand-in; replies maps model -> text, exception or callable"""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies[kwargs["model"]]
+        if callable(reply):
+            reply = reply(kwargs)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def make_router(models, replies, budget_ms=1000, max_inflight=16):
+    client = FakeClient(replies)
+    routes = {"node": {"budget_ms": budget_ms, "models": models + [LOCAL], "max_tokens": 10}}
+    return ModelRouter(routes, lambda: client, max_inflight=max_inflight), client
+
+
+def test_error_rate_skips_to_next_model():
+    router, client = make_router(["a", "b"], {"a": RuntimeError("500"), "b": " fine "})
+    for _ in range(MIN_SAMPLES):
+        assert router.complete("node", "hi", 0.3) == "fine"
+
+    client.calls.clear()
+    assert router.complete("node", "hi", 0.3) == "fine"
+    assert [call["model"] for call in client.calls] == ["b"]
+    assert router.metrics()["decisions"]["node/a/skipped_errors"] == 1
+
+
+def test_latency_and_load_skip_only_with_an_alternative():
+    router, _ = make_router(["a", "b"], {})
+    for _ in range(MIN_SAMPLES):
+        router._model_stats("node", "a").record(5.0, True)
+    assert router.select("node") == "b"
+    assert router.select("node", exclude=("b",)) == "a"
+
+    router, _ = make_router(["a", "b"], {}, max_inflight=1)
+    router._inflight["a"] = 1
+    assert router.select("node") == "b"
+    assert router.select("node", exclude=("b",)) == "a"
+
+
+def test_local_when_candidates_run_out():
+    router, client = make_router(["a", "b"], {"a": RuntimeError("down"), "b": RuntimeError("down")})
+    with pytest.raises(LocalFallback):
+        router.complete("node", "hi", 0.3)
+    assert [call["model"] for call in client.calls] == ["a", "b"]
+    assert router.select("node", exclude=("a", "b")) == LOCAL
+    assert router.metrics()["inflight"] == {"a": 0, "b": 0}
+
+
+def test_usage_counts_every_request_sent():
+    router, _ = make_router(["a", "b"], {"a": RuntimeError("429"), "b": "ok"})
+    usage = {"prompt_tokens": 0}
+    prompt = "How was your day? " * 10
+    router.complete("node", prompt, 0.3, usage=usage)
+    assert usage["prompt_tokens"] == 2 * estimate_tokens(prompt)
+
+
+def test_budget_timeouts_count_as_latency_not_errors():
+    def slow(kwargs):
+        time.sleep(kwargs["timeout"])
+        return TimeoutError("Request timed out")
+
+    router, _ = make_router(["a"], {"a": slow}, budget_ms=20)
+    for _ in range(MIN_SAMPLES + 1):
+        with pytest.raises(LocalFallback):
+            router.complete("node", "hi", 0.3)
+
+    summary = router.metrics()["models"]["node/a"]
+    assert summary["error_rate"] == 0.0
+    assert router.select("node") == "a"
+
+
+def test_skipped_model_is_probed_and_recovers(monkeypatch):
+    monkeypatch.setattr(routing, "PROBE_SECONDS", 0.05)
+    replies = {"a": RuntimeError("500"), "b": "backup"}
+    router, client = make_router(["a", "b"], replies)
+    for _ in range(MIN_SAMPLES):
+        router.complete("node", "hi", 0.3)
+
+    replies["a"] = "recovered"
+    assert router.complete("node", "hi", 0.3) == "backup"
+    time.sleep(0.06)
+    assert router.complete("node", "hi", 0.3) == "recovered"
+    assert router.complete("node", "hi", 0.3) == "recovered"
+    decisions = router.metrics()["decisions"]
+    assert decisions["node/a/probe"] == 1
+    assert decisions["node/a/skipped_errors"] == 1
+
+
+def test_load_routes_env_overrides_file(tmp_path, monkeypatch):
+    config = tmp_path / "routes.json"
+    config.write_text(json.dumps({
+        "node": {"budget_ms": 500, "models": ["file-model", LOCAL]},
+        "unknown": {"budget_ms": 1}
+    }))
+    monkeypatch.setenv("EMOTION_ROUTING_CONFIG", str(config))
+    monkeypatch.setenv("EMOTION_ROUTE_NODE_MODELS", "env-a, env-b,")
+    defaults = {"node": {"budget_ms": 1000, "models": ["default", LOCAL], "max_tokens": 10}}
+
+    routes = load_routes(defaults)
+
+    assert routes == {"node": {"budget_ms": 500, "models": ["env-a", "env-b"], "max_tokens": 10}}
+    assert defaults["node"]["models"] == ["default", LOCAL]
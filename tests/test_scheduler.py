@@ -0,0 +1,148 @@
+"""
+Tests for the shared token buckets and the priority scheduler
+"""
+
+import threading
+import time
+
+import pytest
+
+from ai import scheduler
+from ai.scheduler import (GroqScheduler, SchedulerTimeout, TokenBuckets,
+                          INTERACTIVE, REFLECTION, BACKGROUND)
+
+
+def set_level(buckets, key, level):
+    # Empty a key's request bucket (or put it in debt) as of now
+    buckets._connect().execute(
+        "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+        (f"{key}:requests", level, time.time())
+    )
+
+
+def wait_queued(sched, count):
+    for _ in range(500):
+        if sum(m["queued"] for m in sched.metrics().values()) == count:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"Expected {count} queued waiters")
+
+
+def run_waiters(sched, calls):
+    """Start acquire() calls one after another, returning grant order"""
+    order = []
+    lock = threading.Lock()
+
+    def waiter(name, key, user, priority):
+        sched.acquire(key, 10, user=user, priority=priority)
+        with lock:
+            order.append(name)
+
+    threads = []
+    for i, (name, key, user, priority) in enumerate(calls):
+        thread = threading.Thread(target=waiter, args=(name, key, user, priority))
+        thread.start()
+        threads.append(thread)
+        wait_queued(sched, i + 1)
+    for thread in threads:
+        thread.join(timeout=10)
+    return order
+
+
+def test_reserve_never_blocks_tiny_buckets(tmp_path):
+    buckets = TokenBuckets(str(tmp_path / "limits.db"), rpm=1, tpm=1000)
+    assert buckets.try_take("m", 50, scheduler.RESERVE[REFLECTION]) == 0.0
+    assert buckets.try_take("m", 50, scheduler.RESERVE[REFLECTION]) > 0
+
+    buckets = TokenBuckets(str(tmp_path / "other.db"), rpm=1, tpm=100)
+    assert buckets.try_take("m", 5000, scheduler.RESERVE[BACKGROUND]) == 0.0
+
+
+def test_reserve_keeps_capacity_for_interactive(tmp_path):
+    buckets = TokenBuckets(str(tmp_path / "limits.db"), rpm=4, tpm=100000)
+    set_level(buckets, "m", 1.5)
+    assert buckets.try_take("m", 10, scheduler.RESERVE[BACKGROUND]) > 0
+    assert buckets.try_take("m", 10, scheduler.RESERVE[INTERACTIVE]) == 0.0
+
+
+def test_heavy_user_queues_behind_light_user(tmp_path, monkeypatch):
+    monkeypatch.setitem(scheduler.RESERVE, INTERACTIVE, 0.0)
+    sched = GroqScheduler(str(tmp_path / "limits.db"), rpm=600, tpm=10**9, max_wait=10)
+    set_level(sched.buckets, "m", -1)
+
+    order = run_waiters(sched, [
+        ("heavy-1", "m", "heavy", INTERACTIVE),
+        ("heavy-2", "m", "heavy", INTERACTIVE),
+        ("light-1", "m", "light", INTERACTIVE),
+    ])
+    assert order == ["heavy-1", "light-1", "heavy-2"]
+
+
+def test_interactive_goes_ahead_of_background(tmp_path, monkeypatch):
+    monkeypatch.setitem(scheduler.RESERVE, BACKGROUND, 0.0)
+    sched = GroqScheduler(str(tmp_path / "limits.db"), rpm=600, tpm=10**9, max_wait=10)
+    set_level(sched.buckets, "m", -1)
+
+    order = run_waiters(sched, [
+        ("background", "m", "bulk", BACKGROUND),
+        ("interactive", "m", "user", INTERACTIVE),
+    ])
+    assert order == ["interactive", "background"]
+
+
+def test_exhausted_key_does_not_block_another(tmp_path):
+    sched = GroqScheduler(str(tmp_path / "limits.db"), rpm=60, tpm=10**9, max_wait=2)
+    set_level(sched.buckets, "slow-model", -600)
+    errors = []
+
+    def blocked():
+        try:
+            sched.acquire("slow-model", 10, user="u1", max_wait=1.0)
+        except SchedulerTimeout as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=blocked)
+    thread.start()
+    wait_queued(sched, 1)
+
+    started = time.monotonic()
+    sched.acquire("fast-model", 10, user="u2")
+    assert time.monotonic() - started < 0.5
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_slow_bucket_io_does_not_hold_other_keys(tmp_path, monkeypatch):
+    sched = GroqScheduler(str(tmp_path / "limits.db"), rpm=60, tpm=10**9, max_wait=5)
+    try_take = sched.buckets.try_take
+    in_take = threading.Event()
+
+    def slow_take(key, tokens, reserve=0.0):
+        # Stands in for a BEGIN IMMEDIATE stuck behind another process
+        if key == "locked-model":
+            in_take.set()
+            time.sleep(1.0)
+        return try_take(key, tokens, reserve)
+
+    monkeypatch.setattr(sched.buckets, "try_take", slow_take)
+    thread = threading.Thread(target=sched.acquire, args=("locked-model", 10))
+    thread.start()
+    in_take.wait(timeout=5)
+
+    started = time.monotonic()
+    sched.acquire("other-model", 10)
+    assert time.monotonic() - started < 0.5
+    thread.join()
+
+
+def test_timeout_cleans_up_queue_state(tmp_path):
+    sched = GroqScheduler(str(tmp_path / "limits.db"), rpm=60, tpm=10**9, max_wait=10)
+    set_level(sched.buckets, "m", -600)
+
+    with pytest.raises(SchedulerTimeout):
+        sched.acquire("m", 10, user="u1", max_wait=0.05)
+
+    assert sched._heaps == {}
+    assert sched._last_tag == {}
+    assert sched.metrics()["interactive"]["timeouts"] == 1
+    assert sched.metrics()["interactive"]["queued"] == 0
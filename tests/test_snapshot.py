@@ -0,0 +1,196 @@
+"""
+Tests for the columnar snapshot format and EmotionStorage snapshots
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import snapshot
+from utils.snapshot import SnapshotStore, SEGMENT_PATTERN
+from utils.storage import EmotionStorage
+
+
+def make_entries(count, start=0):
+    base = datetime(2026, 3, 1, 9, 30)
+    return [
+        {
+            "timestamp": (base + timedelta(minutes=i, microseconds=i * 7)).isoformat(),
+            "user_input": f"entry {i} – naïve café 我今天很累",
+            "emotion": ["Happy", "Sad", "Tired"][i % 3],
+            "mood_score": i % 5 + 1,
+            "energy_score": (i + 2) % 5 + 1,
+            "stress_score": (i + 4) % 5 + 1,
+            "keywords": ["calm", "busy", "hopeful"],
+            "reflection": "That sounds like a lot. Be gentle with yourself."
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def segment_names(directory):
+    return sorted(n for n in os.listdir(directory) if SEGMENT_PATTERN.match(n))
+
+
+def test_round_trip(tmp_path):
+    entries = make_entries(10)
+    store = SnapshotStore(str(tmp_path))
+    store.append(entries)
+
+    reader = store.open()
+    try:
+        assert reader.entries() == entries
+        assert len(reader) == 10
+    finally:
+        reader.close()
+
+
+def test_keywords_round_trip_exactly(tmp_path):
+    entries = make_entries(4)
+    entries[0]["keywords"] = []
+    entries[1]["keywords"] = [""]
+    entries[2]["keywords"] = ["a\x1fb", "", "c"]
+    entries[3]["keywords"] = ["only"]
+    store = SnapshotStore(str(tmp_path))
+    store.append(entries)
+
+    reader = store.open()
+    try:
+        assert [e["keywords"] for e in reader.entries()] == [[], [""], ["a\x1fb", "", "c"], ["only"]]
+    finally:
+        reader.close()
+
+
+def test_column_analytics_match_entries(tmp_path):
+    entries = make_entries(9)
+    store = SnapshotStore(str(tmp_path))
+    store.append(entries[:4])
+    store.append(entries[4:])
+
+    reader = store.open()
+    try:
+        assert reader.get_emotion_counts() == {"Happy": 3, "Sad": 3, "Tired": 3}
+        assert reader.score_sum("mood_scores") == sum(e["mood_score"] for e in entries)
+        assert reader.get_mood_timeline() == [
+            {"timestamp": e["timestamp"], "mood_score": e["mood_score"], "emotion": e["emotion"]}
+            for e in entries
+        ]
+    finally:
+        reader.close()
+
+
+def test_compaction_merges_segments_in_order(tmp_path):
+    store = SnapshotStore(str(tmp_path), compact_after=3)
+    entries = []
+    for batch in range(5):
+        chunk = make_entries(2, start=batch * 2)
+        entries += chunk
+        store.append(chunk)
+
+    assert segment_names(tmp_path) == ["00000001-00000004.seg", "00000005-00000005.seg"]
+    reader = store.open()
+    try:
+        assert reader.entries() == entries
+    finally:
+        reader.close()
+
+
+def test_compaction_keeps_segments_outside_its_range(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path), compact_after=100)
+    store.append(make_entries(1, start=0))
+    store.append(make_entries(1, start=1))
+    late = make_entries(1, start=2)
+
+    # Another segment lands while the compacted one is being encoded
+    encode = snapshot.encode_segment
+
+    def encode_then_append(entries):
+        data = encode(entries)
+        store._write(3, 3, encode(late))
+        return data
+
+    monkeypatch.setattr(snapshot, "encode_segment", encode_then_append)
+    store.compact()
+    monkeypatch.setattr(snapshot, "encode_segment", encode)
+
+    assert segment_names(tmp_path) == ["00000001-00000002.seg", "00000003-00000003.seg"]
+    reader = store.open()
+    try:
+        assert reader.entries() == make_entries(3)
+    finally:
+        reader.close()
+
+
+def test_storage_save_and_load(tmp_path):
+    storage = EmotionStorage()
+    for entry in make_entries(3):
+        storage.add_entry(entry["user_input"], entry["emotion"], entry["mood_score"],
+                          entry["energy_score"], entry["stress_score"],
+                          entry["keywords"], entry["reflection"])
+    storage.save_snapshot(str(tmp_path))
+    storage.add_entry("one more", "Happy", 5, 5, 1, ["joy"], "Nice!")
+
+    assert storage.get_entry_count() == 4
+    assert storage.get_emotion_counts() == {"Happy": 2, "Sad": 1, "Tired": 1}
+
+    loaded = EmotionStorage.load_snapshot(str(tmp_path))
+    try:
+        assert loaded.get_all_entries() == storage.get_all_entries()[:3]
+        assert loaded.get_insights().startswith("You've logged 3 emotion entries.")
+    finally:
+        loaded.close()
+        storage.close()
+
+
+def test_storage_save_to_other_directory_copies_history(tmp_path):
+    first, second = str(tmp_path / "a"), str(tmp_path / "b")
+    storage = EmotionStorage()
+    storage.add_entry("hello", "Happy", 4, 4, 2, ["warm"], "Glad to hear it.")
+    storage.save_snapshot(first)
+    storage.add_entry("tired", "Tired", 2, 1, 3, ["sleepy"], "Rest well.")
+    storage.save_snapshot(second)
+
+    loaded = EmotionStorage.load_snapshot(second)
+    try:
+        assert [e["user_input"] for e in loaded.get_all_entries()] == ["hello", "tired"]
+    finally:
+        loaded.close()
+        storage.close()
+
+
+def test_mood_series_reads_columns(tmp_path):
+    entries = make_entries(5)
+    storage = EmotionStorage()
+    storage.entries = entries[:3]
+    storage.save_snapshot(str(tmp_path))
+    storage.entries = entries[3:]
+
+    series = storage.get_mood_series()
+    try:
+        assert series["timestamps"] == [snapshot.timestamp_millis(e["timestamp"]) for e in entries]
+        assert series["mood_scores"] == [e["mood_score"] for e in entries]
+        assert series["emotions"] == [e["emotion"] for e in entries]
+    finally:
+        storage.close()
+
+
+def test_truncated_segment_is_rejected(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.append(make_entries(3))
+    path = os.path.join(tmp_path, segment_names(tmp_path)[0])
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for size in (0, snapshot.HEADER.size - 1, len(data) - 1):
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        with pytest.raises(ValueError, match="Truncated"):
+            store.open()
+
+
+def test_load_snapshot_does_not_create_directory(tmp_path):
+    missing = tmp_path / "typo"
+    with pytest.raises(FileNotFoundError):
+        EmotionStorage.load_snapshot(str(missing))
+    assert not missing.exists()
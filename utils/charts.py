@@ -37,9 +37,30 @@ def create_mood_timeline(mood_data: List[Dict[str, Any]]) -> go.Figure:
         return fig
     
     # Extract data
-    timestamps = [entry["timestamp"] for entry in mood_data]
-    mood_scores = [entry["mood_score"] for entry in mood_data]
-    emotions = [entry["emotion"] for entry in mood_data]
+    return create_mood_timeline_from_series({
+        "timestamps": [entry["timestamp"] for entry in mood_data],
+        "mood_scores": [entry["mood_score"] for entry in mood_data],
+        "emotions": [entry["emotion"] for entry in mood_data]
+    })
+
+
+def create_mood_timeline_from_series(series: Dict[str, list]) -> go.Figure:
+    """
+    Create the mood timeline from parallel lists
+    
+    Args:
+        series: Dict with timestamps (ISO strings or milliseconds since
+            epoch), mood_scores and emotions, as from get_mood_series
+        
+    Returns:
+        Plotly Figure object
+    """
+    if not series["timestamps"]:
+        return create_mood_timeline([])
+    
+    timestamps = series["timestamps"]
+    mood_scores = series["mood_scores"]
+    emotions = series["emotions"]
     
     # Create line chart
     fig = go.Figure()
@@ -58,6 +79,7 @@ def create_mood_timeline(mood_data: List[Dict[str, Any]]) -> go.Figure:
     fig.update_layout(
         title="Mood Timeline",
         xaxis_title="Time",
+        xaxis=dict(type="date"),
         yaxis_title="Mood Score (1-5)",
         yaxis=dict(range=[0, 6], dtick=1),
         height=350,
@@ -0,0 +1,410 @@
+"""
+Binary columnar snapshots for emotion journal entries
+Stores fixed-width score/timestamp/emotion columns plus a string heap,
+opened through mmap so analytics can read columns without copying
+"""
+
+import mmap
+import os
+import re
+import struct
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+
+MAGIC = b"EMSNAP01"
+VERSION = 2
+
+# magic, version, row count, emotion dictionary size, string count,
+# then offsets of: timestamps, mood, energy, stress, emotion codes,
+# keyword index, string index, string heap, followed by the heap length
+HEADER = struct.Struct("<8sIIII9Q")
+
+EPOCH = datetime(1970, 1, 1)
+
+# String table layout: emotion dictionary, then user_input and reflection
+# for every row, then every row's keywords back to back. The keyword index
+# column holds n+1 positions into that trailing keyword run.
+STRINGS_PER_ROW = 2
+
+SEGMENT_PATTERN = re.compile(r"^(\d{8})-(\d{8})\.seg$")
+
+
+def _timestamp_to_micros(timestamp: str) -> int:
+    delta = datetime.fromisoformat(timestamp) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _micros_to_timestamp(micros: int) -> str:
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def timestamp_millis(timestamp: str) -> float:
+    """Convert an ISO timestamp to the milliseconds since epoch used by chart axes"""
+    return _timestamp_to_micros(timestamp) / 1000
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def encode_segment(entries: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode entries into a single columnar segment
+
+    Args:
+        entries: Journal entries as produced by EmotionStorage.add_entry
+
+    Returns:
+        Segment bytes ready to be written to disk
+    """
+    row_count = len(entries)
+
+    emotions: List[str] = []
+    emotion_codes: Dict[str, int] = {}
+    codes = []
+    for entry in entries:
+        emotion = entry["emotion"]
+        if emotion not in emotion_codes:
+            emotion_codes[emotion] = len(emotions)
+            emotions.append(emotion)
+        codes.append(emotion_codes[emotion])
+
+    strings = [e.encode("utf-8") for e in emotions]
+    for entry in entries:
+        strings.append(entry["user_input"].encode("utf-8"))
+        strings.append(entry["reflection"].encode("utf-8"))
+    keyword_index = [0]
+    for entry in entries:
+        strings.extend(keyword.encode("utf-8") for keyword in entry["keywords"])
+        keyword_index.append(keyword_index[-1] + len(entry["keywords"]))
+
+    string_offsets = [0]
+    for s in strings:
+        string_offsets.append(string_offsets[-1] + len(s))
+
+    # Lay out sections, keeping every column 8-byte aligned
+    ts_off = _align(HEADER.size)
+    mood_off = _align(ts_off + 8 * row_count)
+    energy_off = _align(mood_off + row_count)
+    stress_off = _align(energy_off + row_count)
+    emotion_off = _align(stress_off + row_count)
+    keyword_off = _align(emotion_off + 2 * row_count)
+    index_off = _align(keyword_off + 4 * len(keyword_index))
+    heap_off = _align(index_off + 8 * len(string_offsets))
+    heap_len = string_offsets[-1]
+
+    buf = bytearray(heap_off + heap_len)
+    HEADER.pack_into(
+        buf, 0, MAGIC, VERSION, row_count, len(emotions), len(strings),
+        ts_off, mood_off, energy_off, stress_off, emotion_off,
+        keyword_off, index_off, heap_off, heap_len
+    )
+    struct.pack_into(f"<{row_count}q", buf, ts_off,
+                     *(_timestamp_to_micros(e["timestamp"]) for e in entries))
+    buf[mood_off:mood_off + row_count] = bytes(e["mood_score"] for e in entries)
+    buf[energy_off:energy_off + row_count] = bytes(e["energy_score"] for e in entries)
+    buf[stress_off:stress_off + row_count] = bytes(e["stress_score"] for e in entries)
+    struct.pack_into(f"<{row_count}H", buf, emotion_off, *codes)
+    struct.pack_into(f"<{len(keyword_index)}I", buf, keyword_off, *keyword_index)
+    struct.pack_into(f"<{len(string_offsets)}Q", buf, index_off, *string_offsets)
+    buf[heap_off:] = b"".join(strings)
+
+    return bytes(buf)
+
+
+class SnapshotSegment:
+    """A single memory-mapped segment file with zero-copy column views"""
+
+    def __init__(self, path: str):
+        """
+        Map a segment file into memory
+
+        Args:
+            path: Path to the .seg file
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            # mmap refuses empty files and the header would read past the end
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"Truncated snapshot segment: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._map_columns()
+        except Exception:
+            self.close()
+            raise
+
+    def _map_columns(self) -> None:
+        (magic, version, self.row_count, emotion_count, string_count,
+         ts_off, mood_off, energy_off, stress_off, emotion_off,
+         keyword_off, index_off, heap_off, heap_len) = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not an emotion snapshot segment: {self.path}")
+        if heap_off + heap_len > len(self._view):
+            raise ValueError(f"Truncated snapshot segment: {self.path}")
+
+        n = self.row_count
+        self.timestamps = self._view[ts_off:ts_off + 8 * n].cast("q")
+        self.mood_scores = self._view[mood_off:mood_off + n]
+        self.energy_scores = self._view[energy_off:energy_off + n]
+        self.stress_scores = self._view[stress_off:stress_off + n]
+        self.emotion_codes = self._view[emotion_off:emotion_off + 2 * n].cast("H")
+        self._keyword_index = self._view[keyword_off:keyword_off + 4 * (n + 1)].cast("I")
+        self._string_index = self._view[index_off:index_off + 8 * (string_count + 1)].cast("Q")
+        self._heap = self._view[heap_off:heap_off + heap_len]
+        self.emotions = [self._string(i) for i in range(emotion_count)]
+        self._keyword_base = emotion_count + STRINGS_PER_ROW * n
+
+    def _string(self, index: int) -> str:
+        start = self._string_index[index]
+        end = self._string_index[index + 1]
+        return str(self._heap[start:end], "utf-8")
+
+    def _row_string(self, row: int, field: int) -> str:
+        return self._string(len(self.emotions) + STRINGS_PER_ROW * row + field)
+
+    def timestamp(self, row: int) -> str:
+        """Return the ISO timestamp of a row"""
+        return _micros_to_timestamp(self.timestamps[row])
+
+    def emotion(self, row: int) -> str:
+        """Return the emotion name of a row"""
+        return self.emotions[self.emotion_codes[row]]
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """
+        Materialize a single row as a journal entry dict
+
+        Args:
+            row: Row number within this segment
+
+        Returns:
+            Entry dict in the same shape as EmotionStorage entries
+        """
+        keywords = [self._string(self._keyword_base + i)
+                    for i in range(self._keyword_index[row], self._keyword_index[row + 1])]
+        return {
+            "timestamp": self.timestamp(row),
+            "user_input": self._row_string(row, 0),
+            "emotion": self.emotion(row),
+            "mood_score": self.mood_scores[row],
+            "energy_score": self.energy_scores[row],
+            "stress_score": self.stress_scores[row],
+            "keywords": keywords,
+            "reflection": self._row_string(row, 1)
+        }
+
+    def close(self) -> None:
+        """Release all column views and unmap the file"""
+        for name in ("timestamps", "mood_scores", "energy_scores", "stress_scores",
+                     "emotion_codes", "_keyword_index", "_string_index", "_heap"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class SnapshotReader:
+    """Read-only view over all live segments of a snapshot directory"""
+
+    def __init__(self, directory: str, segments: List[SnapshotSegment]):
+        self.directory = directory
+        self.segments = segments
+
+    def __len__(self) -> int:
+        return sum(segment.row_count for segment in self.segments)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Materialize every row as entry dicts
+
+        Returns:
+            List of journal entries in insertion order
+        """
+        return [segment.entry(row)
+                for segment in self.segments
+                for row in range(segment.row_count)]
+
+    def score_sum(self, column: str) -> int:
+        """
+        Sum a score column across all segments without copying it
+
+        Args:
+            column: One of mood_scores, energy_scores, stress_scores
+
+        Returns:
+            Sum of the column
+        """
+        return sum(sum(getattr(segment, column)) for segment in self.segments)
+
+    def get_emotion_counts(self) -> Dict[str, int]:
+        """
+        Count emotions straight from the emotion code columns
+
+        Returns:
+            Dictionary mapping emotion to count
+        """
+        emotion_counts: Dict[str, int] = {}
+        for segment in self.segments:
+            code_counts = [0] * len(segment.emotions)
+            for code in segment.emotion_codes:
+                code_counts[code] += 1
+            for emotion, count in zip(segment.emotions, code_counts):
+                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + count
+        return emotion_counts
+
+    def get_mood_series(self) -> Dict[str, list]:
+        """
+        Read the chart series straight from the columns
+
+        Timestamps stay numeric, so no per-row formatting or dicts are needed.
+
+        Returns:
+            Dict of parallel lists: timestamps (milliseconds since epoch),
+            mood_scores and emotions
+        """
+        series: Dict[str, list] = {"timestamps": [], "mood_scores": [], "emotions": []}
+        for segment in self.segments:
+            series["timestamps"].extend(micros / 1000 for micros in segment.timestamps.tolist())
+            series["mood_scores"].extend(segment.mood_scores.tolist())
+            names = segment.emotions
+            series["emotions"].extend(names[code] for code in segment.emotion_codes.tolist())
+        return series
+
+    def get_mood_timeline(self) -> List[Dict[str, Any]]:
+        """
+        Build timeline points from the timestamp, mood and emotion columns
+
+        Returns:
+            List of dicts with timestamp, mood_score and emotion
+        """
+        return [
+            {
+                "timestamp": segment.timestamp(row),
+                "mood_score": segment.mood_scores[row],
+                "emotion": segment.emotion(row)
+            }
+            for segment in self.segments
+            for row in range(segment.row_count)
+        ]
+
+    def close(self) -> None:
+        """Unmap every segment"""
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+
+class SnapshotStore:
+    """
+    Append-only segment directory with periodic compaction
+
+    Segments are named FIRST-LAST.seg where FIRST and LAST are the range of
+    append sequence numbers they cover. Compaction writes one segment
+    spanning the whole range before deleting the ones it replaces, so a
+    crash in between never loses or duplicates rows.
+
+    A directory must have a single writer: append and compact assume no
+    other process adds segments concurrently.
+    """
+
+    def __init__(self, directory: str, compact_after: int = 8):
+        """
+        Args:
+            directory: Directory holding the segment files
+            compact_after: Compact once this many live segments exist
+        """
+        self.directory = os.path.abspath(directory)
+        self.compact_after = compact_after
+
+    def _open_segments(self, live: List[tuple]) -> SnapshotReader:
+        segments: List[SnapshotSegment] = []
+        try:
+            for _, _, name in live:
+                segments.append(SnapshotSegment(os.path.join(self.directory, name)))
+        except Exception:
+            for segment in segments:
+                segment.close()
+            raise
+        return SnapshotReader(self.directory, segments)
+
+    def _live_segments(self) -> List[tuple]:
+        ranges = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                ranges.append((int(match.group(1)), int(match.group(2)), name))
+
+        # Prefer the widest segment starting at each sequence number and
+        # skip anything already covered by a compacted range
+        ranges.sort(key=lambda r: (r[0], -r[1]))
+        live = []
+        covered = 0
+        for first, last, name in ranges:
+            if first > covered:
+                live.append((first, last, name))
+                covered = last
+        return live
+
+    def _write(self, first: int, last: int, data: bytes) -> None:
+        # Created on first write, so opening a mistyped path creates nothing
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{first:08d}-{last:08d}.seg")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Write entries as a new segment, compacting if too many accumulate
+
+        Args:
+            entries: Journal entries to append
+        """
+        if not entries:
+            return
+        live = self._live_segments() if os.path.isdir(self.directory) else []
+        seq = live[-1][1] + 1 if live else 1
+        self._write(seq, seq, encode_segment(entries))
+        if len(live) + 1 > self.compact_after:
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge all live segments into a single segment"""
+        live = self._live_segments()
+        if len(live) < 2:
+            return
+        first, last = live[0][0], live[-1][1]
+        reader = self._open_segments(live)
+        try:
+            data = encode_segment(reader.entries())
+        finally:
+            reader.close()
+        self._write(first, last, data)
+
+        # Remove only what the new segment covers, including leftovers of
+        # an earlier interrupted compaction inside the same range
+        compacted = f"{first:08d}-{last:08d}.seg"
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if (match and name != compacted
+                    and int(match.group(1)) >= first and int(match.group(2)) <= last):
+                os.remove(os.path.join(self.directory, name))
+
+    def open(self) -> SnapshotReader:
+        """
+        Map every live segment for reading
+
+        Returns:
+            SnapshotReader over the current segments
+
+        Raises:
+            FileNotFoundError: If the directory does not exist
+        """
+        return self._open_segments(self._live_segments())
@@ -1,11 +1,13 @@
 """
 In-memory storage for emotion journal entries
-Provides functionality to store entries and export as JSON
+Provides functionality to store entries, export as JSON and persist
+columnar snapshots
 """
 
 import json
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from utils.snapshot import SnapshotStore, SnapshotReader, timestamp_millis
 
 
 class EmotionStorage:
@@ -13,7 +15,54 @@ class EmotionStorage:
     
     def __init__(self):
         """Initialize empty storage"""
+        # Entries added since the last snapshot; older history stays mapped
         self.entries: List[Dict[str, Any]] = []
+        self._snapshot: Optional[SnapshotReader] = None
+        # Bumped on every change so callers can cache derived analytics
+        self.version = 0
+    
+    @classmethod
+    def load_snapshot(cls, directory: str) -> "EmotionStorage":
+        """
+        Open a snapshot directory without parsing or copying its rows
+        
+        Args:
+            directory: Snapshot directory written by save_snapshot
+            
+        Returns:
+            EmotionStorage backed by the memory-mapped snapshot
+            
+        Raises:
+            FileNotFoundError: If the directory does not exist
+        """
+        storage = cls()
+        storage._snapshot = SnapshotStore(directory).open()
+        return storage
+    
+    def save_snapshot(self, directory: str) -> None:
+        """
+        Append unsaved entries to a snapshot directory as a new segment
+        
+        Args:
+            directory: Snapshot directory to append to
+        """
+        store = SnapshotStore(directory)
+        pending = self.entries
+        if self._snapshot is not None and self._snapshot.directory != store.directory:
+            pending = self._snapshot.entries() + pending
+        store.append(pending)
+        
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = store.open()
+        self.entries = []
+    
+    def close(self) -> None:
+        """Unmap the backing snapshot, if any"""
+        if self._snapshot is not None:
+            self.entries = self._snapshot.entries() + self.entries
+            self._snapshot.close()
+            self._snapshot = None
     
     def add_entry(self, user_input: str, emotion: str, mood_score: int, 
                   energy_score: int, stress_score: int, keywords: List[str], 
@@ -41,6 +90,7 @@ class EmotionStorage:
             "reflection": reflection
         }
         self.entries.append(entry)
+        self.version += 1
     
     def get_all_entries(self) -> List[Dict[str, Any]]:
         """
@@ -49,6 +99,8 @@ class EmotionStorage:
         Returns:
             List of all journal entries
         """
+        if self._snapshot is not None:
+            return self._snapshot.entries() + self.entries
         return self.entries
     
     def get_entry_count(self) -> int:
@@ -58,7 +110,8 @@ class EmotionStorage:
         Returns:
             Count of entries
         """
-        return len(self.entries)
+        snapshot_count = len(self._snapshot) if self._snapshot is not None else 0
+        return snapshot_count + len(self.entries)
     
     def export_to_json(self) -> str:
         """
@@ -67,7 +120,7 @@ class EmotionStorage:
         Returns:
             JSON string of all entries
         """
-        return json.dumps(self.entries, indent=2, ensure_ascii=False)
+        return json.dumps(self.get_all_entries(), indent=2, ensure_ascii=False)
     
     def get_emotion_counts(self) -> Dict[str, int]:
         """
@@ -77,6 +130,8 @@ class EmotionStorage:
             Dictionary mapping emotion to count
         """
         emotion_counts = {}
+        if self._snapshot is not None:
+            emotion_counts = self._snapshot.get_emotion_counts()
         for entry in self.entries:
             emotion = entry.get("emotion", "Unknown")
             emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
@@ -89,7 +144,10 @@ class EmotionStorage:
         Returns:
             List of dicts with timestamp and mood_score
         """
-        return [
+        timeline = []
+        if self._snapshot is not None:
+            timeline = self._snapshot.get_mood_timeline()
+        return timeline + [
             {
                 "timestamp": entry["timestamp"],
                 "mood_score": entry["mood_score"],
@@ -98,6 +156,25 @@ class EmotionStorage:
             for entry in self.entries
         ]
     
+    def get_mood_series(self) -> Dict[str, list]:
+        """
+        Get the mood timeline as parallel lists for charting
+        
+        Snapshot rows are read straight from their columns, so this avoids
+        building a dict and formatting a timestamp for every entry.
+        
+        Returns:
+            Dict with timestamps (milliseconds since epoch), mood_scores and emotions
+        """
+        series = {"timestamps": [], "mood_scores": [], "emotions": []}
+        if self._snapshot is not None:
+            series = self._snapshot.get_mood_series()
+        for entry in self.entries:
+            series["timestamps"].append(timestamp_millis(entry["timestamp"]))
+            series["mood_scores"].append(entry["mood_score"])
+            series["emotions"].append(entry["emotion"])
+        return series
+    
     def get_insights(self) -> str:
         """
         Generate text insights from stored data
@@ -105,12 +182,18 @@ class EmotionStorage:
         Returns:
             Insight text based on patterns in the data
         """
-        if len(self.entries) == 0:
+        entry_count = self.get_entry_count()
+        if entry_count == 0:
             return "No entries yet. Start tracking your emotions to see insights!"
         
-        # Calculate average scores
-        avg_mood = sum(e["mood_score"] for e in self.entries) / len(self.entries)
-        avg_stress = sum(e["stress_score"] for e in self.entries) / len(self.entries)
+        # Calculate average scores, reading snapshot columns in place
+        mood_total = sum(e["mood_score"] for e in self.entries)
+        stress_total = sum(e["stress_score"] for e in self.entries)
+        if self._snapshot is not None:
+            mood_total += self._snapshot.score_sum("mood_scores")
+            stress_total += self._snapshot.score_sum("stress_scores")
+        avg_mood = mood_total / entry_count
+        avg_stress = stress_total / entry_count
         
         # Find most common emotion
         emotion_counts = self.get_emotion_counts()
@@ -118,7 +201,7 @@ class EmotionStorage:
         
         # Generate insight
         insights = []
-        insights.append(f"You've logged {len(self.entries)} emotion entries.")
+        insights.append(f"You've logged {entry_count} emotion entries.")
         insights.append(f"Your most common emotion is: **{most_common}**")
         insights.append(f"Average mood: **{avg_mood:.1f}/5**")
         insights.append(f"Average stress: **{avg_stress:.1f}/5**")